@@ -0,0 +1,62 @@
+"""File helpers shared by the corpus tools (corpus_check, regen_meta, validate_schemas)."""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+NEWLINE_CHUNK = 1 << 20
+
+
+@contextmanager
+def mapped(path: str | os.PathLike[str]) -> Iterator[Any]:
+    """Yield a read-only buffer over path, memory-mapped unless the file is empty."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+                mm.madvise(mmap.MADV_WILLNEED)
+            yield mm
+
+
+def count_lines(data: Any) -> int:
+    """Count b"\\n" in a buffer, plus one for a final line without a newline."""
+    if len(data) == 0:
+        return 0
+    # mmap has no count(); scan in bounded slices instead of copying the file.
+    n = 0
+    for i in range(0, len(data), NEWLINE_CHUNK):
+        n += data[i:i + NEWLINE_CHUNK].count(b"\n")
+    if data[-1:] != b"\n":
+        n += 1
+    return n
+
+
+def dedupe_by_content(paths: List[Path], group: Optional[Callable[[Path], Hashable]] = None) -> List[Path]:
+    """Map each path to the first one with identical bytes (and equal group key).
+
+    Files are only hashed (BLAKE2b; this is dedup, not integrity) when their
+    size and group key collide with another's.
+    """
+    by_size: Dict[Any, List[Path]] = {}
+    for p in paths:
+        key = (p.stat().st_size, group(p) if group is not None else None)
+        by_size.setdefault(key, []).append(p)
+
+    rep: Dict[Path, Path] = {}
+    for candidates in by_size.values():
+        if len(candidates) == 1:
+            rep[candidates[0]] = candidates[0]
+            continue
+        first: Dict[bytes, Path] = {}
+        for p in candidates:
+            h = hashlib.blake2b(p.read_bytes(), digest_size=16).digest()
+            rep[p] = first.setdefault(h, p)
+    return [rep[p] for p in paths]
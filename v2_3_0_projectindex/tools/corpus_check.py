@@ -15,61 +15,156 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Iterable, Tuple, List, Dict
+from typing import Any, Iterable, Tuple, List, Dict, Set
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    from ._fileutil import count_lines, dedupe_by_content, mapped
+except ImportError:
+    # Run as a script: tools/ itself is sys.path[0].
+    from _fileutil import count_lines, dedupe_by_content, mapped
 
 
 def _is_sorted(seq: Iterable[Any]) -> bool:
-    it = iter(seq)
-    try:
-        prev = next(it)
-    except StopIteration:
-        return True
-    for x in it:
-        if x < prev:
+    # Timsort is linear on already-sorted input, and both the sort and the
+    # list comparison run in C.
+    lst = list(seq)
+    return lst == sorted(lst)
+
+
+def _well_typed(keys: Iterable[Tuple[Any, Any, Any, Any]]) -> bool:
+    for file_id, line, col_start, col_end in keys:
+        if type(file_id) is not str or type(line) is not int or type(col_start) is not int or type(col_end) is not int:
             return False
-        prev = x
     return True
 
 
-def _file_meta(path: Path) -> tuple[int, int, str]:
-    data = path.read_bytes()
-    sha = hashlib.sha256(data).hexdigest()
-    text = data.decode('utf-8', errors='replace')
-    lines = text.count('\n')
-    if len(text) > 0 and not text.endswith('\n'):
-        lines += 1
-    return (len(data), lines, sha)
+def _check_keys(keys: List[Any]) -> Tuple[bool, bool]:
+    """Return (sorted_ok, has_duplicates) for a list of occurrence keys."""
+    # Sort-and-compare and set construction both run in C; a single Python
+    # loop tracking prev and a seen set is slower despite touching keys once.
+    return keys == sorted(keys), len(set(keys)) != len(keys)
+
+
+_OCC_KEY = itemgetter('file_id', 'line', 'col_start', 'col_end')
+_KEY_FILE_LINE = itemgetter(0, 1)
+
+# Below this many expected files the process pool costs more than it saves:
+# a corpus file checks in well under 0.1 ms, while each worker costs several
+# ms to start.
+_PARALLEL_MIN_FILES = 128
+_POOL_CHUNKSIZE = 8
+
+# With hash_on_threads, an expected file's inputs are hashed on threads
+# only when they total at least this much.
+_THREAD_MIN_BYTES = 4 << 20
+
+
+def _file_meta(path: str | os.PathLike[str]) -> tuple[int, int, str]:
+    with mapped(path) as data:
+        # Hashing the mapping is zero-copy; hashlib.file_digest would instead
+        # stream the file through an intermediate read buffer.
+        sha = hashlib.sha256(data).hexdigest()
+        lines = count_lines(data)
+        return (len(data), lines, sha)
+
+
+@lru_cache(maxsize=4096)
+def _file_meta_cached(path_str: str, mtime_ns: int) -> tuple[int, int, str]:
+    # Keyed on mtime as well so an input rewritten mid-run is re-hashed.
+    return _file_meta(path_str)
+
+
+def _file_metas(
+    paths: List[str], mtimes: List[int], total_bytes: int, hash_on_threads: bool = False
+) -> List[tuple[int, int, str]]:
+    """Metadata for several inputs, hashed on threads only when it can pay off.
+
+    hashlib releases the GIL while hashing large buffers, but a thread pool
+    per expected file costs more than it saves on small inputs, and inside
+    process-pool workers every core is already busy.
+    """
+    workers = min(len(paths), os.cpu_count() or 1)
+    if not hash_on_threads or workers < 2 or total_bytes < _THREAD_MIN_BYTES:
+        return list(map(_file_meta_cached, paths, mtimes))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_file_meta_cached, paths, mtimes))
 
 
 def _case_root_from_expected(expected_json: Path) -> Path:
     """Given .../corpus/<case>/expected/<file>.expected.json return .../corpus/<case>."""
-    if expected_json.parent.name == 'expected':
-        return expected_json.parent.parent
+    parent = expected_json.parent
+    if parent.name == 'expected':
+        return parent.parent
     # fallback
     return expected_json.parents[2]
 
 
-def _check_file_metadata(expected_path: Path, doc: Dict[str, Any], inputs_dir: Path) -> List[str]:
+def _find_expected(corpus_root: Path) -> List[Path]:
+    """Return sorted corpus/**/expected/*.expected.json paths.
+
+    Walks with os.scandir (via os.walk) instead of Path.glob, and does not
+    descend into case inputs/ directories, which hold source trees only.
+    """
+    out: List[Path] = []
+    for dirpath, dirnames, filenames in os.walk(corpus_root):
+        dirnames[:] = [d for d in dirnames if d != 'inputs']
+        if os.path.basename(dirpath) == 'expected':
+            out.extend(Path(dirpath, n) for n in filenames if n.endswith('.expected.json'))
+    return sorted(out)
+
+
+def _check_file_metadata(
+    expected_path: Path, doc: Dict[str, Any], inputs_dir: str, hash_on_threads: bool = False
+) -> List[str]:
     errs: List[str] = []
     files = doc.get('files', [])
     if not isinstance(files, list):
         return errs
 
+    # First pass resolves entries (keeping each error in files[] order);
+    # the inputs found are then hashed together.
+    entries: List[Any] = []
+    paths: List[str] = []
+    mtimes: List[int] = []
+    total_bytes = 0
     for f in files:
         try:
             file_id = str(f['file_id'])
         except Exception:
-            errs.append(f"{expected_path}: malformed files[] entry {f!r}")
+            entries.append(f"{expected_path}: malformed files[] entry {f!r}")
             continue
 
-        in_path = inputs_dir / file_id
-        if not in_path.exists():
-            errs.append(f"{expected_path}: input file missing: {in_path}")
+        # Plain string paths: this runs per file entry, and Path objects are
+        # comparatively expensive to build.
+        in_path = os.path.join(inputs_dir, file_id)
+        try:
+            st = os.stat(in_path)
+        except OSError:
+            entries.append(f"{expected_path}: input file missing: {in_path}")
             continue
 
-        bytes_actual, lines_actual, sha_actual = _file_meta(in_path)
+        entries.append((f, file_id))
+        paths.append(in_path)
+        mtimes.append(st.st_mtime_ns)
+        total_bytes += st.st_size
+
+    metas = iter(_file_metas(paths, mtimes, total_bytes, hash_on_threads))
+    for entry in entries:
+        if isinstance(entry, str):
+            errs.append(entry)
+            continue
+        f, file_id = entry
+        bytes_actual, lines_actual, sha_actual = next(metas)
 
         # Only enforce fields that exist in expected JSON.
         if 'bytes' in f and int(f['bytes']) != bytes_actual:
@@ -82,12 +177,19 @@ def _check_file_metadata(expected_path: Path, doc: Dict[str, Any], inputs_dir: P
     return errs
 
 
-def check_symbol_index_doc(expected_path: Path, doc: Dict[str, Any], inputs_dir: Path) -> List[str]:
+def check_symbol_index_doc(
+    expected_path: Path,
+    doc: Dict[str, Any],
+    inputs_dir: str | os.PathLike[str],
+    trusted_types: bool = False,
+    hash_on_threads: bool = False,
+) -> List[str]:
     errs: List[str] = []
 
     # ---- Check file metadata (if present) ----
-    if inputs_dir.exists():
-        errs.extend(_check_file_metadata(expected_path, doc, inputs_dir))
+    inputs_dir = os.fspath(inputs_dir)
+    if os.path.exists(inputs_dir):
+        errs.extend(_check_file_metadata(expected_path, doc, inputs_dir, hash_on_threads))
 
     # ---- Symbol ordering + invariants ----
     symbols = doc.get('symbols', [])
@@ -106,23 +208,40 @@ def check_symbol_index_doc(expected_path: Path, doc: Dict[str, Any], inputs_dir:
             errs.append(f"{expected_path}: {ident}: occurrences is not an array")
             continue
 
-        keys: List[Tuple[str, int, int, int]] = []
-        for o in occs:
-            try:
-                keys.append((
-                    str(o['file_id']),
-                    int(o['line']),
-                    int(o['col_start']),
-                    int(o['col_end']),
-                ))
-            except Exception:
-                errs.append(f"{expected_path}: {ident}: malformed occurrence {o!r}")
-                continue
-
-        if not _is_sorted(keys):
+        # Fast path: schema-valid occurrences already carry the right types,
+        # so take the raw field tuples and only probe their types (or not at
+        # all when the caller vouches for them). A mistyped field that slips
+        # past trusted_types makes the sort or set raise TypeError (e.g. a str
+        # line among ints); such symbols take the slow path instead.
+        keys: List[Tuple[str, int, int, int]]
+        try:
+            keys = list(map(_OCC_KEY, occs))
+            well_formed = trusted_types or _well_typed(keys)
+            if well_formed:
+                sorted_ok, dup = _check_keys(keys)
+        except Exception:
+            well_formed = False
+
+        if not well_formed:
+            # Slow path: coerce per occurrence so each malformed entry is reported.
+            # (file_id, line) pairs are collected on the way, since an entry
+            # that is malformed only in its columns still occupies a line.
+            keys = []
+            line_pairs: Set[Tuple[str, int]] = set()
+            for o in occs:
+                try:
+                    file_line = (str(o['file_id']), int(o['line']))
+                    line_pairs.add(file_line)
+                    keys.append(file_line + (int(o['col_start']), int(o['col_end'])))
+                except Exception:
+                    errs.append(f"{expected_path}: {ident}: malformed occurrence {o!r}")
+                    continue
+            sorted_ok, dup = _check_keys(keys)
+
+        if not sorted_ok:
             errs.append(f"{expected_path}: {ident}: occurrences not sorted")
 
-        if len(keys) != len(set(keys)):
+        if dup:
             errs.append(f"{expected_path}: {ident}: duplicate occurrences found")
 
         stats = s.get('stats')
@@ -134,17 +253,27 @@ def check_symbol_index_doc(expected_path: Path, doc: Dict[str, Any], inputs_dir:
                 errs.append(f"{expected_path}: {ident}: stats.occurrence_count={oc} != {len(occs)}")
 
             if ul is not None:
-                # Multi-file safe: unique (file_id, line) pairs.
-                unique_lines = len({(str(o.get('file_id')), int(o.get('line'))) for o in occs if 'file_id' in o and 'line' in o})
+                # Multi-file safe: unique (file_id, line) pairs, taken from the
+                # keys rather than by re-reading occs.
+                if well_formed:
+                    unique_lines = len(set(map(_KEY_FILE_LINE, keys)))
+                else:
+                    unique_lines = len(line_pairs)
                 if int(ul) != unique_lines:
                     errs.append(f"{expected_path}: {ident}: stats.unique_line_count={ul} != {unique_lines}")
 
     return errs
 
 
-def check_project_index(expected_path: Path, doc: Dict[str, Any], case_root: Path) -> List[str]:
+def check_project_index(
+    expected_path: Path,
+    doc: Dict[str, Any],
+    case_root: Path,
+    trusted_types: bool = False,
+    hash_on_threads: bool = False,
+) -> List[str]:
     errs: List[str] = []
-    inputs_dir = case_root / 'inputs'
+    inputs_dir = os.path.join(case_root, 'inputs')
 
     indexes = doc.get('indexes', [])
     if not isinstance(indexes, list):
@@ -159,15 +288,29 @@ def check_project_index(expected_path: Path, doc: Dict[str, Any], case_root: Pat
             errs.append(f"{expected_path}: ProjectIndex.indexes[{i}] is not an object")
             continue
         # Reuse the SymbolIndex checks, but tag errors with embedded index number.
-        sub_errs = check_symbol_index_doc(expected_path, idx, inputs_dir)
+        sub_errs = check_symbol_index_doc(expected_path, idx, inputs_dir, trusted_types, hash_on_threads)
         errs.extend([e.replace(str(expected_path), f"{expected_path} (indexes[{i}])") for e in sub_errs])
 
     return errs
 
 
+def check_expected_file(expected_path: Path, trusted_types: bool = False, hash_on_threads: bool = False) -> List[str]:
+    doc = _json.loads(expected_path.read_bytes())
+    case_root = _case_root_from_expected(expected_path)
+
+    if isinstance(doc, dict) and doc.get('schema_version') == '2.3':
+        return check_project_index(expected_path, doc, case_root, trusted_types, hash_on_threads)
+    return check_symbol_index_doc(expected_path, doc, os.path.join(case_root, 'inputs'), trusted_types, hash_on_threads)
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description='Run contract checks on corpus expected outputs')
     ap.add_argument('--repo-root', default=None, help='Repo root (defaults to parent of tools/)')
+    ap.add_argument(
+        '--trusted-types',
+        action='store_true',
+        help='Skip occurrence field type probing (only safe after validate_schemas.py has passed)',
+    )
     args = ap.parse_args()
 
     repo_root = Path(args.repo_root) if args.repo_root else Path(__file__).resolve().parents[1]
@@ -177,21 +320,34 @@ def main() -> int:
         print(f"Corpus directory not found: {corpus_root}")
         return 1
 
-    expected_files = sorted(corpus_root.glob('**/expected/*.expected.json'))
+    expected_files = _find_expected(corpus_root)
     if not expected_files:
         print(f"No expected outputs found under: {corpus_root}")
         return 1
 
+    # Identical outputs checked against the same inputs yield the same
+    # errors, so only one of them is checked.
+    reps = dedupe_by_content(expected_files, _case_root_from_expected)
+    unique = list(dict.fromkeys(reps))
+
+    check = partial(check_expected_file, trusted_types=args.trusted_types)
+    if len(unique) < _PARALLEL_MIN_FILES:
+        # Serial here, so threads have idle cores to hash large inputs on;
+        # pool workers already keep every core busy.
+        results = [check(p, hash_on_threads=True) for p in unique]
+    else:
+        chunks = -(-len(unique) // _POOL_CHUNKSIZE)
+        with ProcessPoolExecutor(max_workers=min(chunks, os.cpu_count() or 1)) as ex:
+            results = list(ex.map(check, unique, chunksize=_POOL_CHUNKSIZE))
+    errs_by_rep = dict(zip(unique, results))
+
     all_errs: List[str] = []
-    for p in expected_files:
-        doc = json.loads(p.read_text(encoding='utf-8'))
-        case_root = _case_root_from_expected(p)
-        inputs_dir = case_root / 'inputs'
-
-        if isinstance(doc, dict) and doc.get('schema_version') == '2.3':
-            all_errs.extend(check_project_index(p, doc, case_root))
-        else:
-            all_errs.extend(check_symbol_index_doc(p, doc, inputs_dir))
+    for p, rep in zip(expected_files, reps):
+        errs = errs_by_rep[rep]
+        if rep is not p:
+            # Duplicate of an already-checked file: re-tag its errors.
+            errs = [e.replace(str(rep), str(p)) for e in errs]
+        all_errs.extend(errs)
 
     if all_errs:
         print('Corpus contract check: FAILED')
@@ -23,24 +23,58 @@ import argparse
 import csv
 import json
 import sys
+from pathlib import Path
+
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+FIELDS = ("identifier", "file_id", "line", "col_start", "col_end")
+BYTE_FIELDS = ("byte_start", "byte_end")
 
 
 def _iter_rows(symbol_index: dict):
+    """Yield rows as tuples in FIELDS + BYTE_FIELDS order.
+
+    Byte offsets missing from an occurrence are None.
+    """
     for sym in symbol_index.get("symbols", []):
         ident = sym["identifier"]
         for occ in sym.get("occurrences", []):
-            row = {
-                "identifier": ident,
-                "file_id": occ["file_id"],
-                "line": occ["line"],
-                "col_start": occ["col_start"],
-                "col_end": occ["col_end"],
-            }
-            if "byte_start" in occ:
-                row["byte_start"] = occ["byte_start"]
-            if "byte_end" in occ:
-                row["byte_end"] = occ["byte_end"]
-            yield row
+            if len(occ) == 4:
+                # Common case: only the required fields, so no byte offsets.
+                bs = be = None
+            else:
+                bs = occ.get("byte_start")
+                be = occ.get("byte_end")
+            yield (ident, occ["file_id"], occ["line"], occ["col_start"], occ["col_end"], bs, be)
+
+
+def _row_dict(row: tuple) -> dict:
+    d = dict(zip(FIELDS, row))
+    if row[5] is not None:
+        d["byte_start"] = row[5]
+    if row[6] is not None:
+        d["byte_end"] = row[6]
+    return d
+
+
+def _jsonl_line(d: dict) -> bytes:
+    # Compact separators in the stdlib path keep output byte-identical to
+    # orjson's, whichever is in use.
+    if _orjson is not None:
+        return _orjson.dumps(d, option=_orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(d, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _has_byte_fields(symbol_index: dict) -> bool:
+    return any(
+        "byte_start" in occ or "byte_end" in occ
+        for sym in symbol_index.get("symbols", [])
+        for occ in sym.get("occurrences", [])
+    )
 
 
 def main() -> int:
@@ -50,29 +84,34 @@ def main() -> int:
     ap.add_argument("--out", dest="out", default="-", help="Output path or '-' for stdout")
     args = ap.parse_args()
 
-    with open(args.inp, "r", encoding="utf-8") as f:
-        obj = json.load(f)
+    data = Path(args.inp).read_bytes()
+    obj = _orjson.loads(data) if _orjson is not None else json.loads(data)
 
-    rows = list(_iter_rows(obj))
+    # Rows are streamed straight to the output; only the CSV header needs
+    # a look-ahead, and that scans occurrences without building rows.
+    rows = _iter_rows(obj)
 
-    out_f = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
+    # JSONL is written as UTF-8 bytes; CSV goes through the text layer.
+    if args.format == "jsonl":
+        out_f = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    else:
+        out_f = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8", newline="")
     try:
         if args.format == "jsonl":
             for r in rows:
-                out_f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                out_f.write(_jsonl_line(_row_dict(r)))
         else:
-            # stable header
-            fieldnames = ["identifier", "file_id", "line", "col_start", "col_end"]
-            has_bytes = any(("byte_start" in r or "byte_end" in r) for r in rows)
-            if has_bytes:
-                fieldnames += ["byte_start", "byte_end"]
-            w = csv.DictWriter(out_f, fieldnames=fieldnames)
-            w.writeheader()
-            for r in rows:
-                w.writerow(r)
+            # stable header; csv.writer renders None as an empty field
+            w = csv.writer(out_f)
+            if _has_byte_fields(obj):
+                w.writerow(FIELDS + BYTE_FIELDS)
+                w.writerows(rows)
+            else:
+                w.writerow(FIELDS)
+                w.writerows(r[:5] for r in rows)
         return 0
     finally:
-        if out_f is not sys.stdout:
+        if args.out != "-":
             out_f.close()
 
 
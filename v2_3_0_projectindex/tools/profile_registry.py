@@ -12,64 +12,282 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import re
+import warnings
+from functools import lru_cache
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 try:
     from pathspec import PathSpec
     from pathspec.patterns.gitwildmatch import GitWildMatchPattern
+    from pathspec.util import normalize_file
 except Exception:
     PathSpec = None
 
 
+def _dumps(obj: Any) -> str:
+    # json escapes non-ASCII, so the output prints on any stdout encoding.
+    # orjson cannot escape; its output is used only when already ASCII (it
+    # still writes floats like 1e16 where json writes 1e+16).
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        if data.isascii():
+            return data.decode("ascii")
+    return json.dumps(obj, indent=2)
+
+
 def _load_registry(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def _match_glob(pattern: str, rel_posix: str) -> bool:
-    """Match git-wildmatch style globs if pathspec is installed, otherwise
-    fallback to Path.match semantics (less powerful for ** patterns).
+@lru_cache(maxsize=None)
+def _glob_regex(pattern: str) -> Optional[re.Pattern]:
+    """Return the git-wildmatch regex for a glob, or None if it can never match.
+
+    Negated or empty patterns never match on their own.
     """
-    if PathSpec is not None:
-        spec = PathSpec.from_lines(GitWildMatchPattern, [pattern])
-        return spec.match_file(rel_posix)
-    # fallback
-    return Path(rel_posix).match(pattern)
+    with warnings.catch_warnings():
+        # Newer pathspec deprecates GitWildMatchPattern; PathSpec.from_lines
+        # used it without surfacing the warning, so keep stderr clean too.
+        warnings.simplefilter("ignore", DeprecationWarning)
+        regex, include = GitWildMatchPattern.pattern_to_regex(pattern)
+    return re.compile(regex) if include is True else None
 
 
-def resolve_profile(registry: dict, file_path: str, root: str | None = None) -> tuple[str, str]:
-    profiles = registry["profiles"]
-    rules = registry["rules"]
+@lru_cache(maxsize=None)
+def _compile_glob(pattern: str) -> Callable[[str], bool]:
+    """Build a Path.match matcher for one glob, once per distinct pattern.
+
+    Only used without pathspec; Path.match is less powerful for ** patterns.
+    """
+    return lambda rel_posix: Path(rel_posix).match(pattern)
+
+
+# Inner named groups (pathspec's ``ps_d``) would clash once rules are joined.
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
+# A wildmatch regex anchored to a literal first path component, e.g. "^src/".
+_LITERAL_ROOT = re.compile(r"\^((?:[\w-]|\\\W)+)/")
+
+
+def _literal_root(regex: re.Pattern) -> Optional[str]:
+    """Return the first path component every match must start with, if fixed."""
+    m = _LITERAL_ROOT.match(regex.pattern)
+    return re.sub(r"\\(.)", r"\1", m.group(1)) if m else None
+
+
+def _combine_rules(rules: List[Tuple[int, re.Pattern, str]]) -> Callable[[str], Optional[str]]:
+    """Join the rules' wildmatch regexes into one alternation.
+
+    Alternatives are tried in rule order, so the group that matches is the
+    first matching rule. The returned function takes a normalized path.
+    """
+    if not rules:
+        return lambda rel_posix: None
+    parts = []
+    aliases = {}
+    for i, regex, alias in rules:
+        parts.append(f"(?P<r{i}>{_NAMED_GROUP.sub('(?:', regex.pattern)})")
+        aliases[f"r{i}"] = alias
+    match = re.compile("|".join(parts)).match
+
+    def resolve(rel_posix: str) -> Optional[str]:
+        m = match(rel_posix)
+        return aliases[m.lastgroup] if m is not None else None
+
+    if hyperscan is not None:
+        return _hyperscan_rules(rules, resolve) or resolve
+    return resolve
+
+
+def _hyperscan_rules(
+    rules: List[Tuple[int, re.Pattern, str]], fallback: Callable[[str], Optional[str]]
+) -> Optional[Callable[[str], Optional[str]]]:
+    """Scan all rules in one Hyperscan pass; the lowest matching rule wins.
+
+    Returns None if any rule's regex is outside Hyperscan's dialect. Paths
+    that are not valid UTF-8 (surrogate-escaped names) use the re fallback.
+    """
+    # Anchor every rule, as re.match does, and drop inner group names.
+    expressions = [f"^(?:{_NAMED_GROUP.sub('(?:', regex.pattern)})".encode("utf-8") for _, regex, _ in rules]
+    flags = hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    try:
+        db.compile(
+            expressions=expressions,
+            ids=[i for i, _, _ in rules],
+            elements=len(rules),
+            flags=[flags] * len(rules),
+        )
+    except hyperscan.error:
+        return None
+    aliases = {i: alias for i, _, alias in rules}
+
+    def resolve(rel_posix: str) -> Optional[str]:
+        try:
+            data = rel_posix.encode("utf-8")
+        except UnicodeEncodeError:
+            return fallback(rel_posix)
+        hits: List[int] = []
+        db.scan(data, match_event_handler=lambda rule_id, *_: hits.append(rule_id))
+        return aliases[min(hits)] if hits else None
 
-    p = Path(file_path)
+    return resolve
+
+
+@lru_cache(maxsize=None)
+def _compile_rules(rules: Tuple[Tuple[str, str], ...]) -> Callable[[str], Optional[str]]:
+    if PathSpec is None:
+        compiled = [(_compile_glob(pattern), alias) for pattern, alias in rules]
+
+        def resolve_each(rel_posix: str) -> Optional[str]:
+            for matches, alias in compiled:
+                if matches(rel_posix):
+                    return alias
+            return None
+
+        return resolve_each
+
+    # Rules whose regex is anchored to a literal first component (e.g.
+    # "src/**/*.cpp") can only match paths under it; bucket them by that
+    # component so each lookup tries one shorter alternation.
+    live = []
+    for i, (pattern, alias) in enumerate(rules):
+        regex = _glob_regex(pattern)
+        if regex is not None:
+            live.append((i, pattern, regex, alias, _literal_root(regex)))
+    roots = {root for *_, root in live if root is not None}
+    anywhere = _bucket_rules([rule[:4] for rule in live if rule[4] is None])
+    by_root = {r: _bucket_rules([rule[:4] for rule in live if rule[4] in (None, r)]) for r in roots}
+
+    def resolve(rel_posix: str) -> Optional[str]:
+        rel_posix = normalize_file(rel_posix)
+        return by_root.get(rel_posix.partition("/")[0], anywhere)(rel_posix)
+
+    return resolve
+
+
+# "*.ext" or "**/*.ext" with a plain, dot-free extension.
+_EXT_GLOB = re.compile(r"(?:\*\*/)?\*\.([\w+-]+)")
+
+
+def _bucket_rules(rules: List[Tuple[int, str, re.Pattern, str]]) -> Callable[[str], Optional[str]]:
+    """Resolve within one bucket, dispatching extension rules by dict lookup.
+
+    An extension rule ("*.py", "**/*.py") matches whenever the file name
+    ends in its extension, but also when a directory name does. So when the
+    directory part has no ".", no earlier extension rule can match, and
+    only the earlier non-extension rules need a regex test.
+    """
+    general = _combine_rules([(i, regex, alias) for i, _, regex, alias in rules])
+    by_ext: Dict[str, Tuple[str, Callable[[str], Optional[str]]]] = {}
+    others = []
+    for i, pattern, regex, alias in rules:
+        m = _EXT_GLOB.fullmatch(pattern)
+        if m is None:
+            others.append((i, regex, alias))
+        elif m.group(1) not in by_ext:
+            by_ext[m.group(1)] = (alias, _combine_rules(list(others)))
+    if not by_ext:
+        return general
+
+    def resolve(rel_posix: str) -> Optional[str]:
+        head, _, name = rel_posix.rpartition("/")
+        hit = by_ext.get(name.rpartition(".")[2]) if "." in name and "." not in head else None
+        if hit is None:
+            return general(rel_posix)
+        alias, before = hit
+        earlier = before(rel_posix)
+        return alias if earlier is None else earlier
+
+    return resolve
+
+
+def _compile_registry(registry: dict) -> Callable[[str], Optional[str]]:
+    """Return a function mapping a relative POSIX path to the first matching alias."""
+    return _compile_rules(tuple((rule["match"]["glob"], rule["profile"]) for rule in registry["rules"]))
+
+
+def _rel_posix(file_path: str, root: str | None) -> str:
+    # Plain strings throughout; Path() is only needed for the spellings it
+    # would normalize (".", "//", trailing "/", or a non-"/" separator).
     if root is not None:
-        rel = Path(os.path.relpath(p, root)).as_posix()
-    else:
-        rel = p.as_posix()
+        rel = os.path.relpath(file_path or ".", root)
+        return rel if os.sep == "/" else rel.replace(os.sep, "/")
+    if (
+        os.sep == "/"
+        and file_path
+        and file_path != "."
+        and not file_path.startswith("./")
+        and not file_path.endswith("/")
+        and "//" not in file_path
+        and "/." not in file_path
+    ):
+        return file_path
+    return Path(file_path).as_posix()
 
-    for rule in rules:
-        pat = rule["match"]["glob"]
-        if _match_glob(pat, rel):
-            alias = rule["profile"]
-            if alias not in profiles:
-                raise ValueError(f"Registry rule refers to unknown profile alias: {alias}")
-            return alias, profiles[alias]
 
-    raise ValueError(f"No matching profile rule for file: {rel}")
+def _lookup(profiles: dict, first_match: Callable[[str], Optional[str]], rel: str) -> tuple[str, str]:
+    alias = first_match(rel)
+    if alias is None:
+        raise ValueError(f"No matching profile rule for file: {rel}")
+    if alias not in profiles:
+        raise ValueError(f"Registry rule refers to unknown profile alias: {alias}")
+    return alias, profiles[alias]
+
+
+def resolve_profile(registry: dict, file_path: str, root: str | None = None) -> tuple[str, str]:
+    return _lookup(registry["profiles"], _compile_registry(registry), _rel_posix(file_path, root))
+
+
+def resolve_profiles(
+    registry: dict, file_paths: Iterable[str], root: str | None = None
+) -> Iterator[tuple[str, str, str]]:
+    """Yield (file_path, alias, profile_path) per file, compiling the rules once."""
+    profiles = registry["profiles"]
+    first_match = _compile_registry(registry)
+    for file_path in file_paths:
+        alias, profile_path = _lookup(profiles, first_match, _rel_posix(file_path, root))
+        yield file_path, alias, profile_path
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--registry", default="profiles/registry.json")
     ap.add_argument("--root", default=None)
-    ap.add_argument("file", help="File path to resolve")
+    ap.add_argument("--files-from", default=None, help="Resolve each path listed (one per line) in this file")
+    ap.add_argument("file", nargs="?", help="File path to resolve")
     args = ap.parse_args()
+    if (args.file is None) == (args.files_from is None):
+        ap.error("give either a file path or --files-from")
 
     reg = _load_registry(args.registry)
+    if args.files_from is not None:
+        with open(args.files_from, "r", encoding="utf-8") as f:
+            paths = [line for line in f.read().splitlines() if line]
+        out = [
+            {"file": file_path, "profile_alias": alias, "profile_path": profile_path}
+            for file_path, alias, profile_path in resolve_profiles(reg, paths, args.root)
+        ]
+        print(_dumps(out))
+        return 0
+
     alias, profile_path = resolve_profile(reg, args.file, args.root)
 
     out = {"profile_alias": alias, "profile_path": profile_path}
-    print(json.dumps(out, indent=2))
+    print(_dumps(out))
     return 0
 
 
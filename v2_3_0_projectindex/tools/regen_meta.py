@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """Patch corpus/expected/*.expected.json with bytes/lines/sha256 from corpus/inputs/*.
 
-No external dependencies. Intended as a reproducibility tool across ecosystems.
+No external dependencies (orjson is used for JSON I/O if installed). Intended
+as a reproducibility tool across ecosystems.
 
 Usage:
   python3 tools/regen_meta.py
@@ -9,8 +10,9 @@ Usage:
 Behavior:
 - Reads each expected JSON.
 - For each entry in files[], loads the corresponding inputs/<file_id>.
-- Computes: bytes, lines (1-based line counting), sha256.
-- Writes file in-place with updated fields.
+- Computes: bytes, lines (1-based line counting), sha256. Lines are counted
+  as b"\n" in the raw bytes; the input is never decoded.
+- Writes file in-place with updated fields (skipped when nothing changed).
 """
 
 from __future__ import annotations
@@ -18,6 +20,18 @@ from __future__ import annotations
 import hashlib
 import json
 from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from ._fileutil import count_lines, mapped
+except ImportError:
+    # Run as a script: tools/ itself is sys.path[0].
+    from _fileutil import count_lines, mapped
 
 ROOT = Path(__file__).resolve().parents[1]
 CORPUS = ROOT / "corpus"
@@ -25,22 +39,22 @@ INPUTS = CORPUS / "inputs"
 EXPECTED = CORPUS / "expected"
 
 
-def count_lines(text: str) -> int:
-    if text == "":
-        return 0
-    # Count \n, plus one if file does not end with \n
-    n = text.count("\n")
-    if not text.endswith("\n"):
-        n += 1
-    return n
+def sha256_hex(data: Any) -> str:
+    # Accepts any buffer, including the mmap from mapped(), so no copy is made.
+    return hashlib.sha256(data).hexdigest()
 
 
-def sha256_hex(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+def dumps_json(obj: Any) -> bytes:
+    # orjson's 2-space indent output matches the json fallback below except
+    # for floats in exponent form: orjson writes 1e16 where json writes 1e+16.
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
 
 
 def patch_expected(path: Path) -> None:
-    obj = json.loads(path.read_text(encoding="utf-8"))
+    raw = path.read_bytes()
+    obj = orjson.loads(raw) if orjson is not None else json.loads(raw)
 
     files = obj.get("files", [])
     if not isinstance(files, list):
@@ -55,14 +69,14 @@ def patch_expected(path: Path) -> None:
         if not src.exists():
             raise FileNotFoundError(f"Missing input file: {src}")
 
-        data = src.read_bytes()
-        text = data.decode("utf-8", errors="replace")
-
-        f["bytes"] = len(data)
-        f["lines"] = count_lines(text)
-        f["sha256"] = sha256_hex(data)
+        with mapped(src) as data:
+            f["bytes"] = len(data)
+            f["lines"] = count_lines(data)
+            f["sha256"] = sha256_hex(data)
 
-    path.write_text(json.dumps(obj, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    out = dumps_json(obj)
+    if out != raw:
+        path.write_bytes(out)
 
 
 def main() -> None:
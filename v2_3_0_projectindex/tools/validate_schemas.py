@@ -14,41 +14,355 @@ Exit status:
 from __future__ import annotations
 
 import argparse
-import json
+import copy
+import fnmatch
+import functools
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import jsonschema
 from referencing import Registry, Resource
 
+try:
+    from ._fileutil import dedupe_by_content
+except ImportError:
+    # Run as a script: tools/ itself is sys.path[0].
+    from _fileutil import dedupe_by_content
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+try:
+    import jsonschema_rs
+except ImportError:
+    jsonschema_rs = None
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+# Below this many files the process pool costs more than it saves: an
+# artifact validates in well under 0.1 ms, while each worker costs several
+# ms to start.
+_PARALLEL_MIN_FILES = 128
+_POOL_CHUNKSIZE = 8
+
+# orjson parses JSON at least this large from an mmap; below it, setting up
+# the mapping costs more than the read it saves.
+_MMAP_MIN_BYTES = 1 << 20
+
+# Default schema paths, relative to the repo root.
+_SCHEMA_PROFILE = "schemas/language_profile.schema.json"
+_SCHEMA_INDEX = "schemas/symbol_index.schema.json"
+_SCHEMA_PROJECT = "schemas/project_index.schema.json"
+
+# Per-process validators, installed by _init_validators (in each pool worker,
+# or in-process for small runs). Workers receive schema paths and build their
+# own validators rather than unpickling them.
+_VALIDATORS: Dict[str, Any] = {}
+
+# Optional native (jsonschema-rs) or fastjsonschema-compiled is-valid checks,
+# keyed like _VALIDATORS. They only gate the common valid case; jsonschema
+# stays authoritative and produces the error report whenever a compiled check
+# rejects an instance.
+_FAST_VALIDATORS: Dict[str, Any] = {}
+
+# True when the ProjectIndex schema validates each "indexes" item against the
+# SymbolIndex schema itself, so a passing project needs no per-index pass.
+_PROJECT_COVERS_INDEXES = False
+
 
 def _load_json(path: Path):
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(path, "rb") as f:
+        if _json.__name__ == "orjson" and os.fstat(f.fileno()).st_size >= _MMAP_MIN_BYTES:
+            # Parse straight from the page cache instead of a heap copy.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return _json.loads(view)
+        return _json.loads(f.read())
+
+
+@functools.lru_cache(maxsize=None)
+def _segment_matcher(segment: str) -> Callable[[str], Any]:
+    return re.compile(fnmatch.translate(segment)).fullmatch
+
+
+def _scandir_glob(base: str, segments: Tuple[str, ...]) -> Iterator[Tuple[str, bool]]:
+    """Yield (path, is_file) for paths under base matching the pattern segments.
+
+    Matches what Path.glob would select. Literal segments are joined without
+    listing their directory, so the walk starts at the pattern's literal
+    prefix; each directory below it is read with a single scandir, whose
+    cached entry types answer the is-file/is-dir checks. As in Path.glob,
+    "**" matches zero or more directories and does not descend into
+    symlinked ones.
+    """
+    seg, rest = segments[0], segments[1:]
+    if seg == "**":
+        if rest:
+            yield from _scandir_glob(base, rest)
+        try:
+            with os.scandir(base) as it:
+                subdirs = [e.path for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+        for d in subdirs:
+            yield from _scandir_glob(d, segments)
+        return
+    if not any(c in seg for c in "*?["):
+        path = os.path.join(base, seg)
+        if not rest:
+            yield path, os.path.isfile(path)
+        elif os.path.isdir(path):
+            yield from _scandir_glob(path, rest)
+        return
+    matches = _segment_matcher(seg)
+    try:
+        with os.scandir(base) as it:
+            entries = [e for e in it if matches(e.name) and (not rest or e.is_dir())]
+    except OSError:
+        return
+    for e in entries:
+        if rest:
+            yield from _scandir_glob(e.path, rest)
+        else:
+            yield e.path, e.is_file()
 
 
 def _iter_globs(glob_patterns: Iterable[str], repo_root: Path) -> Iterable[Path]:
-    out: list[Path] = []
+    files: Dict[str, None] = {}
     for pat in glob_patterns:
-        out.extend(sorted(repo_root.glob(pat)))
-    seen = set()
-    for p in sorted(out):
-        if p in seen:
-            continue
-        seen.add(p)
-        if p.is_file():
-            yield p
+        segments = tuple(part for part in pat.split("/") if part and part != ".")
+        for path, is_file in _scandir_glob(str(repo_root), segments):
+            if is_file:
+                files[path] = None
+    yield from sorted(map(Path, files))
 
 
-def _validate_one(validator: jsonschema.validators.Draft202012Validator, instance, path: Path) -> Tuple[bool, str]:
-    errors = sorted(validator.iter_errors(instance), key=lambda e: list(e.path))
-    if not errors:
+def _validate_one(
+    validator: jsonschema.validators.Draft202012Validator, instance, path: Path, fast=None
+) -> Tuple[bool, str]:
+    # Pass/fail first; errors are only collected and sorted on failure.
+    is_valid = fast if fast is not None else validator.is_valid
+    if is_valid(instance):
         return True, ""
+    msg = _format_errors(validator, instance, path)
+    return msg is None, msg or ""
+
+
+def _format_errors(validator: jsonschema.validators.Draft202012Validator, instance, path: Path) -> Optional[str]:
+    # Materialize each error's path once, for both the sort key and the output.
+    errors = [(tuple(e.path), e) for e in validator.iter_errors(instance)]
+    if not errors:
+        return None
+    errors.sort(key=itemgetter(0))
     lines = [f"Validation failed: {path}"]
-    for e in errors:
-        loc = "/" + "/".join(str(p) for p in e.path) if e.path else "/"
+    for loc_parts, e in errors:
+        loc = "/" + "/".join(map(str, loc_parts)) if loc_parts else "/"
         lines.append(f"  - {loc}: {e.message}")
-    return False, "\n".join(lines)
+    return "\n".join(lines)
+
+
+def _schema_stamp(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    if path is None:
+        return None
+    st = Path(path).stat()
+    return st.st_mtime_ns, st.st_size
+
+
+# Latest build per (profile, index, project) schema path triple, with the
+# schema stamps it was built from. A changed stamp replaces the entry, so
+# only one build per triple stays alive.
+_BUILDS: Dict[Tuple[str, str, Optional[str]], Tuple[Tuple[Optional[Tuple[int, int]], ...], Any]] = {}
+
+# Serializes rebuilds so threads sharing this module never compile a schema
+# set twice; lookups that hit the current build skip it.
+_BUILD_LOCK = threading.Lock()
+
+
+def _validators_for(
+    schema_profile_path: str, schema_index_path: str, schema_project_path: Optional[str]
+) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+    key = (schema_profile_path, schema_index_path, schema_project_path)
+    stamps = tuple(_schema_stamp(sp) for sp in key)
+    entry = _BUILDS.get(key)
+    if entry is not None and entry[0] == stamps:
+        return entry[1]
+    with _BUILD_LOCK:
+        entry = _BUILDS.get(key)
+        if entry is None or entry[0] != stamps:
+            entry = (stamps, _build_validators(*key))
+            _BUILDS[key] = entry
+        return entry[1]
+
+
+def get_validator(kind: str, repo_root: Optional[Path] = None) -> Optional[jsonschema.Draft202012Validator]:
+    """Return the shared validator for "profile", "index" or "project" artifacts.
+
+    Built on first use from the repo's default schema paths and reused (from
+    any thread) until a schema file changes. "project" is None when the repo
+    has no ProjectIndex schema.
+    """
+    root = Path(repo_root) if repo_root is not None else Path(__file__).resolve().parent.parent
+    project = root / _SCHEMA_PROJECT
+    validators, _, _ = _validators_for(
+        str(root / _SCHEMA_PROFILE), str(root / _SCHEMA_INDEX), str(project) if project.exists() else None
+    )
+    return validators[kind]
+
+
+def _init_validators(schema_profile_path: str, schema_index_path: str, schema_project_path: Optional[str]) -> None:
+    global _PROJECT_COVERS_INDEXES
+    validators, fast, covers = _validators_for(schema_profile_path, schema_index_path, schema_project_path)
+    _VALIDATORS.update(validators)
+    _PROJECT_COVERS_INDEXES = covers
+    _FAST_VALIDATORS.clear()
+    _FAST_VALIDATORS.update(fast)
+
+
+def _build_validators(
+    schema_profile_path: str, schema_index_path: str, schema_project_path: Optional[str]
+) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+    """Load and compile the schemas; callers go through _validators_for."""
+    schema_profile = _load_json(Path(schema_profile_path))
+    schema_index = _load_json(Path(schema_index_path))
+    schema_project = _load_json(Path(schema_project_path)) if schema_project_path is not None else None
+
+    # Register local schemas so Draft202012 refs resolve without network access,
+    # under their $id and the relative ref keys used in this repo.
+    named = [(schema_profile, "language_profile.schema.json"), (schema_index, "symbol_index.schema.json")]
+    if schema_project is not None:
+        named.append((schema_project, "project_index.schema.json"))
+    resources = []
+    for sch, rel in named:
+        resource = Resource.from_contents(sch)
+        sid = sch.get("$id")
+        if sid:
+            resources.append((sid, resource))
+        resources.append((rel, resource))
+    registry = Registry().with_resources(resources)
+
+    # Crawl once up front; an uncrawled registry re-crawls on every anchor
+    # and subresource lookup during validation.
+    registry = registry.crawl()
+
+    validators: Dict[str, Any] = {
+        "profile": jsonschema.Draft202012Validator(schema_profile, registry=registry),
+        "index": jsonschema.Draft202012Validator(schema_index, registry=registry),
+        "project": None,
+    }
+    if schema_project is not None:
+        validators["project"] = jsonschema.Draft202012Validator(schema_project, registry=registry)
+
+    fast = _compile_fast_validators(schema_profile, schema_index, schema_project)
+    return validators, fast, _covers_indexes(schema_project, schema_index)
+
+
+def _covers_indexes(schema_project: Optional[dict], schema_index: dict) -> bool:
+    if schema_project is None:
+        return False
+    items = schema_project.get("properties", {}).get("indexes", {}).get("items")
+    refs = {"symbol_index.schema.json", schema_index.get("$id")}
+    return isinstance(items, dict) and items.keys() == {"$ref"} and items["$ref"] in refs
+
+
+def _fastjsonschema_check(compiled) -> Callable[[Any], bool]:
+    def check(instance) -> bool:
+        try:
+            compiled(instance)
+        except fastjsonschema.JsonSchemaException:
+            return False
+        return True
+
+    return check
+
+
+def _compile_fast_validators(schema_profile: dict, schema_index: dict, schema_project: Optional[dict]) -> Dict[str, Any]:
+    """Compile an is-valid predicate per schema, preferring jsonschema-rs."""
+    fast: Dict[str, Any] = {}
+    # fastjsonschema rewrites $refs in the dicts it compiles; give both
+    # libraries copies so the jsonschema validators' schemas stay as loaded.
+    kinds = copy.deepcopy({"profile": schema_profile, "index": schema_index, "project": schema_project})
+    # Resolve cross-schema $refs (by $id) from the local schemas, never the network.
+    store = {sch["$id"]: sch for sch in kinds.values() if sch is not None and "$id" in sch}
+    handlers = {"http": store.__getitem__, "https": store.__getitem__}
+    rs_registry = None
+    if jsonschema_rs is not None:
+        try:
+            rs_registry = jsonschema_rs.Registry(list(store.items()))
+        except Exception:
+            # Bindings without Registry cannot resolve the cross-schema $ref.
+            pass
+    for kind, sch in kinds.items():
+        if sch is None:
+            continue
+        if rs_registry is not None:
+            try:
+                fast[kind] = jsonschema_rs.validator_for(sch, registry=rs_registry, validate_formats=False).is_valid
+                continue
+            except Exception:
+                pass
+        if fastjsonschema is None:
+            continue
+        try:
+            # jsonschema does not assert "format" or fill in defaults; match
+            # that, so a rejected instance reaches jsonschema unmodified.
+            fast[kind] = _fastjsonschema_check(
+                fastjsonschema.compile(sch, handlers=handlers, use_formats=False, use_default=False)
+            )
+        except Exception:
+            # Unsupported construct or unresolvable $ref: jsonschema alone.
+            pass
+    return fast
+
+
+def _check_profile(p: Path) -> Tuple[bool, List[str]]:
+    passed, msg = _validate_one(_VALIDATORS["profile"], _load_json(p), p, _FAST_VALIDATORS.get("profile"))
+    return passed, ([] if passed else [msg])
+
+
+def _check_expected(p: Path) -> Tuple[bool, List[str]]:
+    inst = _load_json(p)
+    if isinstance(inst, dict) and inst.get("schema_version") == "2.3":
+        v_project = _VALIDATORS["project"]
+        if v_project is None:
+            return False, [f"ProjectIndex schema missing, cannot validate: {p}"]
+        ok = True
+        msgs: List[str] = []
+        passed, msg = _validate_one(v_project, inst, p, _FAST_VALIDATORS.get("project"))
+        if not passed:
+            ok = False
+            msgs.append(msg)
+        if passed and _PROJECT_COVERS_INDEXES:
+            # Every embedded SymbolIndex already passed as an "indexes" item.
+            return ok, msgs
+        # Also validate embedded SymbolIndex objects
+        v_index = _VALIDATORS["index"]
+        fast_index = _FAST_VALIDATORS.get("index")
+        for i, idx in enumerate(inst.get("indexes", [])):
+            passed2, msg2 = _validate_one(v_index, idx, p, fast_index)
+            if not passed2:
+                ok = False
+                msgs.append(f"Embedded SymbolIndex[{i}] invalid in {p}\n{msg2}")
+        return ok, msgs
+
+    passed, msg = _validate_one(_VALIDATORS["index"], inst, p, _FAST_VALIDATORS.get("index"))
+    return passed, ([] if passed else [msg])
+
+
+_CHECKS = {"profile": _check_profile, "expected": _check_expected}
+
+
+def _check_job(kind: str, p: Path) -> Tuple[bool, List[str]]:
+    return _CHECKS[kind](p)
 
 
 def main() -> int:
@@ -61,9 +375,9 @@ def main() -> int:
         default=["corpus/**/expected/*.expected.json"],
         help="Glob(s) for expected JSON files (SymbolIndex or ProjectIndex).",
     )
-    ap.add_argument("--schema-profile", type=str, default="schemas/language_profile.schema.json", help="Schema path for LanguageProfile.")
-    ap.add_argument("--schema-index", type=str, default="schemas/symbol_index.schema.json", help="Schema path for SymbolIndex.")
-    ap.add_argument("--schema-project", type=str, default="schemas/project_index.schema.json", help="Schema path for ProjectIndex (optional).")
+    ap.add_argument("--schema-profile", type=str, default=_SCHEMA_PROFILE, help="Schema path for LanguageProfile.")
+    ap.add_argument("--schema-index", type=str, default=_SCHEMA_INDEX, help="Schema path for SymbolIndex.")
+    ap.add_argument("--schema-project", type=str, default=_SCHEMA_PROJECT, help="Schema path for ProjectIndex (optional).")
     ap.add_argument("--registry", type=str, default="profiles/registry.json", help="Registry JSON path (optional).")
     ap.add_argument("--registry-schema", type=str, default="profiles/registry.schema.json", help="Registry schema path (optional).")
     args = ap.parse_args()
@@ -71,67 +385,60 @@ def main() -> int:
     tools_dir = Path(__file__).resolve().parent
     repo_root = Path(args.repo).resolve() if args.repo else tools_dir.parent
 
-    schema_profile = _load_json(repo_root / args.schema_profile)
-    schema_index = _load_json(repo_root / args.schema_index)
+    schema_profile_path = repo_root / args.schema_profile
+    schema_index_path = repo_root / args.schema_index
+    for sp in (schema_profile_path, schema_index_path):
+        if not sp.is_file():
+            print(f"Schema not found: {sp}")
+            return 1
 
-    # Register local schemas so Draft202012 refs resolve without network access.
-    registry = Registry()
-    for sch in (schema_profile, schema_index):
-        sid = sch.get("$id")
-        if sid:
-            registry = registry.with_resource(sid, Resource.from_contents(sch))
+    # Workers get schema paths, not schema dicts or validators.
+    schema_project_path = repo_root / args.schema_project
+    schemas = (
+        str(schema_profile_path),
+        str(schema_index_path),
+        str(schema_project_path) if schema_project_path.exists() else None,
+    )
 
-    # Also register common relative ref keys used in this repo.
-    registry = registry.with_resource("language_profile.schema.json", Resource.from_contents(schema_profile))
-    registry = registry.with_resource("symbol_index.schema.json", Resource.from_contents(schema_index))
+    profile_paths = list(_iter_globs(args.profiles, repo_root))
+    expected_paths = list(_iter_globs(args.expected, repo_root))
+    # Schema validity depends only on content: validate duplicates once.
+    expected_reps = dedupe_by_content(expected_paths)
+    expected_unique = list(dict.fromkeys(expected_reps))
 
-    v_profile = jsonschema.Draft202012Validator(schema_profile, registry=registry)
-    v_index = jsonschema.Draft202012Validator(schema_index, registry=registry)
+    # Profiles and expected artifacts go through one job list, so a pool
+    # works through both without a barrier between them; results keep
+    # input order.
+    kinds = ["profile"] * len(profile_paths) + ["expected"] * len(expected_unique)
+    jobs = profile_paths + expected_unique
+    # Build in this process first: forked workers then inherit the cached
+    # build and their initializer only installs it.
+    _init_validators(*schemas)
+    if len(jobs) < _PARALLEL_MIN_FILES:
+        job_results = [_check_job(kind, p) for kind, p in zip(kinds, jobs)]
+    else:
+        chunks = -(-len(jobs) // _POOL_CHUNKSIZE)
+        workers = min(chunks, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_validators, initargs=schemas) as ex:
+            job_results = list(ex.map(_check_job, kinds, jobs, chunksize=_POOL_CHUNKSIZE))
+    results = job_results[:len(profile_paths)]
+    expected_results = job_results[len(profile_paths):]
 
-    schema_project_path = repo_root / args.schema_project
-    v_project = None
-    if schema_project_path.exists():
-        schema_project = _load_json(schema_project_path)
-        sid = schema_project.get("$id")
-        if sid:
-            registry = registry.with_resource(sid, Resource.from_contents(schema_project))
-        registry = registry.with_resource("project_index.schema.json", Resource.from_contents(schema_project))
-        v_project = jsonschema.Draft202012Validator(schema_project, registry=registry)
+    by_rep = dict(zip(expected_unique, expected_results))
+    for p, rep in zip(expected_paths, expected_reps):
+        passed, msgs = by_rep[rep]
+        if rep is not p:
+            # Duplicate of an already-validated file: re-tag its messages.
+            msgs = [m.replace(str(rep), str(p)) for m in msgs]
+        results.append((passed, msgs))
 
     ok = True
-
-    # Validate profiles
-    for p in _iter_globs(args.profiles, repo_root):
-        inst = _load_json(p)
-        passed, msg = _validate_one(v_profile, inst, p)
+    for passed, msgs in results:
         if not passed:
             ok = False
+        for msg in msgs:
             print(msg)
 
-    # Validate expected artifacts
-    for p in _iter_globs(args.expected, repo_root):
-        inst = _load_json(p)
-        if isinstance(inst, dict) and inst.get("schema_version") == "2.3":
-            if v_project is None:
-                ok = False
-                print(f"ProjectIndex schema missing, cannot validate: {p}")
-                continue
-            passed, msg = _validate_one(v_project, inst, p)
-            if not passed:
-                ok = False
-                print(msg)
-            # Also validate embedded SymbolIndex objects
-            for i, idx in enumerate(inst.get("indexes", [])):
-                passed2, msg2 = _validate_one(v_index, idx, p)
-                if not passed2:
-                    ok = False
-                    print(f"Embedded SymbolIndex[{i}] invalid in {p}\n{msg2}")
-        else:
-            passed, msg = _validate_one(v_index, inst, p)
-            if not passed:
-                ok = False
-                print(msg)
-
     # Validate registry (top-level)
     reg_path = repo_root / args.registry
     reg_schema_path = repo_root / args.registry_schema